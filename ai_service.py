@@ -1,64 +1,74 @@
-import json
+import functools
+import random
 import time
+import orjson
 from google import genai
-from config import GEMINI_API_KEY, MODEL_NAME, MAX_RETRIES, INITIAL_BACKOFF
+from google.genai import errors, types
+from pydantic import ValidationError
+from config import GEMINI_API_KEY, MODEL_NAME, MAX_RETRIES, INITIAL_BACKOFF, MAX_BACKOFF, MAX_RETRIES_RATE, MAX_RETRIES_VALIDATION, REQUEST_TIMEOUT_MS, GEMINI_RPM, GEMINI_TPM, MAX_CONCURRENT_REQUESTS, THROTTLE_STATUS_CODES, RETRYABLE_STATUS_CODES, BATCH_CHAR_BUDGET, MAX_BATCH_SIZE
+from cache import ResponseCache
+from rate_limiter import RateLimiter
+from utils import compact_text
+from models import CandidateAssessment, CandidateEvaluation, CANDIDATE_ASSESSMENT_ADAPTER, CANDIDATE_ASSESSMENT_LIST_ADAPTER, CANDIDATE_EVALUATION_ADAPTER
 
-class AIService:
-    def __init__(self):
-        self.client = genai.Client(api_key=GEMINI_API_KEY)
+_rate_limiter = RateLimiter(GEMINI_RPM, 60, max_tokens=GEMINI_TPM, max_concurrency=MAX_CONCURRENT_REQUESTS)
 
-    def call_gemini_api(self, prompt, response_mime_type=None, response_schema=None):
-        contents = [{"parts": [{"text": prompt}]}]
+def _retry_after_seconds(error):
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
 
-        config = None
-        if response_mime_type and response_schema:
-            config = {
-                "response_mime_type": response_mime_type,
-                "response_schema": response_schema
-            }
+def _backoff_delay(attempt):
+    return min(MAX_BACKOFF, INITIAL_BACKOFF * 2 ** attempt) * random.random()
 
-        backoff = INITIAL_BACKOFF
-        for attempt in range(MAX_RETRIES):
-            try:
-                if config:
-                    resp = self.client.models.generate_content(
-                        model=MODEL_NAME,
-                        contents=contents,
-                        config=config
-                    )
-                else:
-                    resp = self.client.models.generate_content(
-                        model=MODEL_NAME,
-                        contents=contents
-                    )
-
-                content_part = getattr(resp, "text", None)
-                if not content_part:
-                    content_part = str(resp)
-
-                if response_mime_type == "application/json":
-                    try:
-                        return json.loads(content_part)
-                    except Exception:
-                        return content_part
-
-                return content_part
+@functools.lru_cache(maxsize=1)
+def _get_client():
+    return genai.Client(api_key=GEMINI_API_KEY, http_options=types.HttpOptions(timeout=REQUEST_TIMEOUT_MS))
 
-            except Exception as e:
-                if attempt < MAX_RETRIES - 1:
-                    time.sleep(backoff)
-                    backoff *= 2
-                    continue
-                return f"API/Network Error: {e}"
+CANDIDATE_DATA_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "matched_skills_full": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "missing_skills_full": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "top_qualifications_full": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "quantifiable_achievements_full": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "relevant_experience_summary": {"type": "STRING"},
+        "years_of_experience": {"type": "NUMBER"},
+        "education_level": {"type": "STRING"}
+    }
+}
 
-        return "API call failed after max retries."
+CANDIDATE_EVALUATION_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "score": {"type": "NUMBER"},
+        "fit": {"type": "STRING", "enum": ["High", "Medium", "Low"]},
+        "rationale": {"type": "STRING"},
+        "matched_skills": {"type": "STRING"},
+        "missing_skills": {"type": "STRING"},
+        "top_qualifications": {"type": "STRING"},
+        "quantifiable_achievements": {"type": "STRING"},
+        "strengths": {"type": "STRING"},
+        "weaknesses": {"type": "STRING"}
+    },
+    "required": ["score", "fit", "rationale"]
+}
 
-    def extract_candidate_data(self, jd_text, cv_text):
-        prompt = f"""
-You are a meticulous data extraction assistant. Your task is to analyze a candidate's CV against a job description (JD) and extract every single piece of relevant information. Do not perform any scoring or filtering. Your output must be a single, complete JSON object.
+CANDIDATE_ASSESSMENT_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "foundational": CANDIDATE_DATA_SCHEMA,
+        "evaluation": CANDIDATE_EVALUATION_SCHEMA
+    }
+}
 
-**JSON Schema:**
-{{
+EXTRACTION_INSTRUCTIONS = """
+**Foundational Data Schema:**
+{
   "matched_skills_full": [STRING],
   "missing_skills_full": [STRING],
   "top_qualifications_full": [STRING],
@@ -66,9 +76,9 @@ You are a meticulous data extraction assistant. Your task is to analyze a candid
   "relevant_experience_summary": STRING,
   "years_of_experience": NUMBER,
   "education_level": STRING
-}}
+}
 
-**Instructions:**
+**Foundational Data Instructions:**
 1. `matched_skills_full`: List all skills from the JD present in the CV.
 2. `missing_skills_full`: List all skills from the JD not present in the CV.
 3. `top_qualifications_full`: List all relevant degrees, certifications, and licenses.
@@ -76,76 +86,186 @@ You are a meticulous data extraction assistant. Your task is to analyze a candid
 5. `relevant_experience_summary`: Provide a 1-2 paragraph summary of the candidate's work history as it relates directly to the JD's requirements.
 6. `years_of_experience`: Total years of professional experience (number).
 7. `education_level`: Highest degree earned (e.g., Bachelor's, Master's, PhD).
-
-**JD:**
-{jd_text}
-
-**CV:**
-{cv_text}
 """
 
-        schema = {
-            "type": "OBJECT",
-            "properties": {
-                "matched_skills_full": {"type": "ARRAY", "items": {"type": "STRING"}},
-                "missing_skills_full": {"type": "ARRAY", "items": {"type": "STRING"}},
-                "top_qualifications_full": {"type": "ARRAY", "items": {"type": "STRING"}},
-                "quantifiable_achievements_full": {"type": "ARRAY", "items": {"type": "STRING"}},
-                "relevant_experience_summary": {"type": "STRING"},
-                "years_of_experience": {"type": "NUMBER"},
-                "education_level": {"type": "STRING"}
-            }
-        }
-
-        result = self.call_gemini_api(prompt, "application/json", schema)
-        if isinstance(result, str):
-            return {
-                "matched_skills_full": [],
-                "missing_skills_full": [],
-                "top_qualifications_full": [],
-                "quantifiable_achievements_full": [],
-                "relevant_experience_summary": "",
-                "years_of_experience": 0,
-                "education_level": "Unknown"
-            }
-        return result
+EVALUATION_INSTRUCTIONS = """
+**Evaluation Schema:**
+{
+  "score": NUMBER,
+  "fit": "High" | "Medium" | "Low",
+  "rationale": STRING,
+  "matched_skills": STRING,
+  "missing_skills": STRING,
+  "top_qualifications": STRING,
+  "quantifiable_achievements": STRING,
+  "strengths": STRING,
+  "weaknesses": STRING
+}
 
-    def evaluate_candidate(self, candidate_data, weights):
-        prompt = f"""
-You are a strict HR evaluation engine. Your task is to evaluate a candidate based on a complete set of extracted data and provide a final, summarized evaluation in a Markdown table.
+**Evaluation Instructions:**
+1. `score`: The overall score from 1 to 10 according to the rubric.
+2. `fit`: `High`, `Medium` or `Low`.
+3. `rationale`: One or two sentences justifying the score.
+4. `matched_skills`, `missing_skills`, `top_qualifications`: Comma-separated summaries.
+5. `quantifiable_achievements`: Semicolon-separated summary of the key achievements.
+6. `strengths`: A single paragraph (2-3 sentences) summarizing the candidate's top strengths.
+7. `weaknesses`: A single paragraph (2-3 sentences) summarizing their key weaknesses.
+"""
 
+def _rubric_text(weights):
+    return f"""
 **Evaluation Rubric (Scoring 1-10):**
 * Matched Skills ({weights['matched_skills_w']}%)
 * Experience Relevance ({weights['experience_relevance_w']}%)
 * Qualifications & Achievements ({weights['qualifications_w']}%)
 * Depth & Seniority ({weights['seniority_w']}%)
 * CV Clarity ({weights['cv_clarity_w']}%)
+"""
 
-**Candidate Data:**
-{json.dumps(candidate_data, indent=2)}
+def batch_by_char_budget(items, char_budget=BATCH_CHAR_BUDGET, max_size=MAX_BATCH_SIZE):
+    batch = []
+    batch_chars = 0
+    for key, text in items:
+        if batch and (batch_chars + len(text) > char_budget or len(batch) >= max_size):
+            yield batch
+            batch = []
+            batch_chars = 0
+        batch.append((key, text))
+        batch_chars += len(text)
+    if batch:
+        yield batch
 
-**Output Table:**
-You must produce a single Markdown table with headers: `Score`, `Fit`, `Rationale`, `Matched Skills`, `Missing Skills`, `Top Qualifications`, `Quantifiable Achievements`.
+@functools.lru_cache(maxsize=8)
+def _evaluation_prompt_prefix(weight_items, jd_text):
+    weights = dict(weight_items)
+    return f"""
+You are a strict HR evaluation engine and an expert HR analyst. Your task is to evaluate a candidate based on a complete set of extracted data and the JD, then provide a final, summarized evaluation together with a concise, professional analysis of the candidate's strengths and weaknesses. Your output must be a single JSON object matching the Evaluation Schema.
+{_rubric_text(weights)}{EVALUATION_INSTRUCTIONS}
+**JD:**
+{compact_text(jd_text)}
 
-| Score | Fit | Rationale | Matched Skills | Missing Skills | Top Qualifications | Quantifiable Achievements |
-|---|---|---|---|---|---|---|
+**Candidate Data:**
 """
 
-        return self.call_gemini_api(prompt)
+@functools.lru_cache(maxsize=8)
+def _assessment_prompt_prefix(weight_items, jd_text, batch_size):
+    weights = dict(weight_items)
+    if batch_size == 1:
+        task = "analyze a candidate's CV against a job description (JD)"
+        output = "a single JSON object with two keys: `foundational` (matching the Foundational Data Schema) and `evaluation` (matching the Evaluation Schema)"
+    else:
+        task = f"analyze each of the {batch_size} candidate CVs below against a single job description (JD), evaluating each CV independently and never mixing details between candidates"
+        output = "a single JSON array with exactly one object per CV, in the same order as the CVs. Each object has two keys: `foundational` (matching the Foundational Data Schema) and `evaluation` (matching the Evaluation Schema)"
+    return f"""
+You are a meticulous data extraction assistant, a strict HR evaluation engine and an expert HR analyst. Your task is to {task}. First extract every single piece of relevant information without scoring or filtering, then evaluate the candidate from that extracted data using the rubric below. Your output must be {output}.
+{EXTRACTION_INSTRUCTIONS}{_rubric_text(weights)}{EVALUATION_INSTRUCTIONS}
+**JD:**
+{compact_text(jd_text)}
+"""
 
-    def analyze_strengths_weaknesses(self, candidate_data, jd_text):
-        prompt = f"""
-You are an expert HR analyst. Based on the following candidate data and JD, provide a concise, professional analysis of the candidate's strengths and weaknesses.
+class AIService:
+    def __init__(self):
+        self.client = _get_client()
+        self.cache = ResponseCache()
 
-**Instructions:**
-* **Strengths:** Write a single paragraph (2-3 sentences) summarizing the candidate's top strengths.
-* **Weaknesses:** Write a single paragraph (2-3 sentences) summarizing their key weaknesses.
+    def call_gemini_api(self, prompt, response_mime_type=None, response_schema=None, validator=None, timeout_ms=REQUEST_TIMEOUT_MS):
+        cache_key = self.cache.make_key(MODEL_NAME, prompt, response_schema)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
 
-**Candidate Data:**
-{json.dumps(candidate_data, indent=2)}
+        contents = [{"parts": [{"text": prompt}]}]
 
-**JD:**
-{jd_text}
-"""
+        config = {"http_options": {"timeout": timeout_ms}}
+        if response_mime_type and response_schema:
+            config["response_mime_type"] = response_mime_type
+            config["response_schema"] = response_schema
+
+        estimated_tokens = len(prompt) // 4
+        rate_attempts = 0
+        transient_attempts = 0
+        validation_attempts = 0
+        while True:
+            _rate_limiter.acquire(estimated_tokens)
+            try:
+                resp = self.client.models.generate_content(
+                    model=MODEL_NAME,
+                    contents=contents,
+                    config=config
+                )
+            except errors.APIError as e:
+                throttled = e.code in THROTTLE_STATUS_CODES
+                _rate_limiter.release(throttled=throttled)
+                if throttled and rate_attempts < MAX_RETRIES_RATE - 1:
+                    time.sleep(min(_retry_after_seconds(e) or _backoff_delay(rate_attempts), MAX_BACKOFF))
+                    rate_attempts += 1
+                    continue
+                if not throttled and e.code in RETRYABLE_STATUS_CODES and transient_attempts < MAX_RETRIES - 1:
+                    time.sleep(_backoff_delay(transient_attempts))
+                    transient_attempts += 1
+                    continue
+                return f"API/Network Error: {e}"
+            except Exception as e:
+                _rate_limiter.release()
+                if transient_attempts < MAX_RETRIES - 1:
+                    time.sleep(_backoff_delay(transient_attempts))
+                    transient_attempts += 1
+                    continue
+                return f"API/Network Error: {e}"
+            _rate_limiter.release()
+
+            content_part = getattr(resp, "text", None)
+            if not content_part:
+                content_part = str(resp)
+
+            if response_mime_type == "application/json":
+                try:
+                    if validator is not None:
+                        result = validator.dump_python(validator.validate_json(content_part))
+                    else:
+                        result = orjson.loads(content_part)
+                except (orjson.JSONDecodeError, ValidationError):
+                    if validation_attempts < MAX_RETRIES_VALIDATION - 1:
+                        validation_attempts += 1
+                        continue
+                    return content_part
+                if isinstance(result, dict) and response_schema and "properties" in response_schema:
+                    result = {k: result[k] for k in response_schema["properties"] if k in result}
+                self.cache.set(cache_key, result)
+                return result
 
-        return self.call_gemini_api(prompt)
+            self.cache.set(cache_key, content_part)
+            return content_part
+
+    def extract_and_evaluate(self, jd_text, cv_text, weights):
+        prefix = _assessment_prompt_prefix(tuple(sorted(weights.items())), jd_text, 1)
+        prompt = f"{prefix}\n**CV:**\n{compact_text(cv_text)}\n"
+
+        result = self.call_gemini_api(prompt, "application/json", CANDIDATE_ASSESSMENT_SCHEMA, CANDIDATE_ASSESSMENT_ADAPTER)
+        if not isinstance(result, dict):
+            return CandidateAssessment().model_dump()
+        return result
+
+    def assess_candidates_batch(self, jd_text, cv_texts, weights):
+        if len(cv_texts) <= 1:
+            return [self.extract_and_evaluate(jd_text, cv_text, weights) for cv_text in cv_texts]
+
+        prefix = _assessment_prompt_prefix(tuple(sorted(weights.items())), jd_text, len(cv_texts))
+        cv_sections = "\n\n".join(f"**CV {i}:**\n{compact_text(cv_text)}" for i, cv_text in enumerate(cv_texts, start=1))
+        prompt = f"{prefix}\n{cv_sections}\n"
+
+        schema = {"type": "ARRAY", "items": CANDIDATE_ASSESSMENT_SCHEMA}
+
+        result = self.call_gemini_api(prompt, "application/json", schema, CANDIDATE_ASSESSMENT_LIST_ADAPTER, REQUEST_TIMEOUT_MS * len(cv_texts))
+        if not isinstance(result, list) or len(result) != len(cv_texts):
+            return [self.extract_and_evaluate(jd_text, cv_text, weights) for cv_text in cv_texts]
+        return result
+
+    def evaluate_and_analyze(self, candidate_data, weights, jd_text):
+        prefix = _evaluation_prompt_prefix(tuple(sorted(weights.items())), jd_text)
+        prompt = prefix + orjson.dumps(candidate_data).decode() + "\n"
+
+        result = self.call_gemini_api(prompt, "application/json", CANDIDATE_EVALUATION_SCHEMA, CANDIDATE_EVALUATION_ADAPTER)
+        if not isinstance(result, dict):
+            return CandidateEvaluation().model_dump()
+        return result
@@ -1,14 +1,18 @@
 import streamlit as st
 import pandas as pd
+import hashlib
 import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
-from config import GEMINI_API_KEY
+from config import GEMINI_API_KEY, MODEL_NAME, MAX_CONCURRENT_REQUESTS, PARSE_WORKERS
 from file_handler import read_uploaded_file
-from ai_service import AIService
-from evaluator import compute_fallback_score, parse_markdown_table
+from ai_service import AIService, batch_by_char_budget
+from models import CandidateData
+from evaluator import compute_fallback_score, format_score, should_skip_cv, skipped_cv_result, structured_evaluation_result
 from database import DatabaseManager
-from utils import to_csv_string, format_score_color, truncate_text
+from utils import CSV_FIELDNAMES, to_csv_bytes, format_score_color, truncate_text
 from styles import get_custom_css
 
 st.set_page_config(
@@ -23,8 +27,12 @@ st.markdown(get_custom_css(), unsafe_allow_html=True)
 if 'db' not in st.session_state:
     st.session_state.db = DatabaseManager()
 
+@st.cache_resource
+def get_ai_service():
+    return AIService()
+
 if 'ai_service' not in st.session_state:
-    st.session_state.ai_service = AIService()
+    st.session_state.ai_service = get_ai_service()
 
 def render_sidebar():
     with st.sidebar:
@@ -41,6 +49,47 @@ def render_sidebar():
 
         return page
 
+def candidate_name_from_filename(filename):
+    return filename.replace('.pdf', '').replace('.txt', '').replace('_', ' ')
+
+def text_digest(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+def ranking_frame(results):
+    df = pd.DataFrame.from_records(results, columns=["filename", "Score", "Fit"])
+    df["Score"] = pd.to_numeric(df["Score"], errors='coerce')
+    return df.sort_values(by="Score", ascending=False, na_position='last', ignore_index=True)
+
+def submit_assessments(ai_service, executor, jd_text, weights, cv_items):
+    phase1_cache = st.session_state.setdefault("phase1", {})
+    jd_key = text_digest(jd_text)
+    keys = {}
+    futures = {}
+
+    def cache_misses():
+        for i, cv_text in cv_items:
+            key = f"phase1-{MODEL_NAME}-{jd_key}-{text_digest(cv_text)}"
+            keys[i] = key
+            cached = phase1_cache.get(key)
+            if cached is None:
+                cached = ai_service.cache.get(key)
+            if cached is None:
+                yield i, cv_text
+            else:
+                phase1_cache[key] = cached
+                future = executor.submit(ai_service.evaluate_and_analyze, cached, weights, jd_text)
+                futures[future] = ([i], cached)
+
+    for batch in batch_by_char_budget(cache_misses()):
+        future = executor.submit(ai_service.assess_candidates_batch, jd_text, [cv_text for _, cv_text in batch], weights)
+        futures[future] = ([i for i, _ in batch], None)
+    return futures, keys
+
+def remember_phase1(ai_service, key, foundational_data):
+    if foundational_data != CandidateData().model_dump():
+        st.session_state["phase1"][key] = foundational_data
+        ai_service.cache.set(key, foundational_data)
+
 def render_evaluation_page():
     st.markdown("<div class='iim-header'><h1>IIM Sirmaur</h1><p>AI-Powered HR Evaluation Tool</p></div>", unsafe_allow_html=True)
 
@@ -134,109 +183,147 @@ def render_evaluation_page():
         }
         critical_skills_list = [s.strip() for s in critical_skills.split(",")] if critical_skills else []
 
-        for i, cv_file in enumerate(cv_files):
-            try:
-                progress_bar.progress((i) / len(cv_files), text=f"Processing {cv_file.name}...")
+        parse_pool = ThreadPoolExecutor(
+            max_workers=PARSE_WORKERS,
+            initializer=add_script_run_ctx,
+            initargs=(None, get_script_run_ctx())
+        )
+        executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS)
+        readable_cvs = []
+        live_ranking = st.empty()
+
+        def show_ranking():
+            live_ranking.dataframe(ranking_frame(evaluated_results), use_container_width=True, hide_index=True)
 
-                cv_text = read_uploaded_file(cv_file)
+        def readable_cv_items():
+            for parse_future in as_completed(parse_futures):
+                cv_file = parse_futures[parse_future]
+                cv_text = parse_future.result()
                 if not cv_text:
                     st.warning(f"Skipping {cv_file.name}: could not read content.")
                     continue
-
-                foundational_data = st.session_state.ai_service.extract_candidate_data(jd_text, cv_text)
-
-                final_table_output = st.session_state.ai_service.evaluate_candidate(foundational_data, weights)
-
-                parsed_data = {}
-                parsed_from_llm = False
-
-                if isinstance(final_table_output, str) and final_table_output and not final_table_output.startswith("API/Network Error"):
-                    parsed_try = parse_markdown_table(final_table_output, cv_file.name)
-                    if parsed_try and 'error' not in parsed_try and (parsed_try.get("Score") or parsed_try.get("Fit")):
-                        parsed_data = parsed_try
-                        parsed_from_llm = True
-
-                if not parsed_from_llm:
-                    fb_score, fb_fit, fb_rationale = compute_fallback_score(foundational_data, cv_text, weights, critical_skills_list)
-                    score_str = str(int(fb_score)) if float(fb_score).is_integer() else str(round(fb_score, 1))
-
-                    parsed_data = {
-                        "filename": cv_file.name,
-                        "Score": score_str,
-                        "Fit": fb_fit,
-                        "Rationale": fb_rationale,
-                        "Matched Skills": ", ".join(foundational_data.get("matched_skills_full", []) or []),
-                        "Missing Skills": ", ".join(foundational_data.get("missing_skills_full", []) or []),
-                        "Top Qualifications": ", ".join(foundational_data.get("top_qualifications_full", []) or []),
-                        "Quantifiable Achievements": "; ".join(foundational_data.get("quantifiable_achievements_full", []) or [])
-                    }
-
-                score_header = parsed_data.get("Score") or "N/A"
-                fit_header = parsed_data.get("Fit") or "N/A"
-                score_class = format_score_color(score_header)
-
-                with st.expander(f"**{cv_file.name}** - Score: {score_header} | Fit: {fit_header}"):
-                    st.markdown(f"<div class='metric-card'>", unsafe_allow_html=True)
-                    st.markdown(f"<span class='{score_class}'>Score: {score_header}/10</span> | Fit: {fit_header}", unsafe_allow_html=True)
-                    st.markdown("</div>", unsafe_allow_html=True)
-
-                    col_a, col_b = st.columns(2)
-
-                    with col_a:
-                        st.markdown("**Matched Skills**")
-                        st.success(parsed_data.get("Matched Skills") or "None identified")
-
-                        st.markdown("**Top Qualifications**")
-                        st.info(parsed_data.get("Top Qualifications") or "None identified")
-
-                    with col_b:
-                        st.markdown("**Missing Skills**")
-                        st.error(parsed_data.get("Missing Skills") or "None identified")
-
-                        st.markdown("**Quantifiable Achievements**")
-                        st.success(parsed_data.get("Quantifiable Achievements") or "None identified")
-
-                    st.markdown("**Rationale**")
-                    st.write(parsed_data.get("Rationale", ""))
-
-                    analysis_result = st.session_state.ai_service.analyze_strengths_weaknesses(foundational_data, jd_text)
-
-                    if isinstance(analysis_result, str) and not analysis_result.startswith("API/Network Error"):
-                        st.markdown("### Strengths & Weaknesses Analysis")
-                        st.markdown(analysis_result)
-
-                    with st.expander("View Raw Extracted Data"):
-                        st.json(foundational_data)
-
-                evaluated_results.append(parsed_data)
-
-                if save_to_db:
-                    candidate_name = cv_file.name.replace('.pdf', '').replace('.txt', '').replace('_', ' ')
-                    st.session_state.db.save_evaluation(job_title, candidate_name, parsed_data)
-
-            except Exception as e:
-                st.error(f"Error processing {getattr(cv_file,'name', 'file')}: {e}")
-                st.text(traceback.format_exc())
-                continue
-
+                skip_reason = should_skip_cv(cv_text)
+                if skip_reason:
+                    st.warning(f"Skipping AI evaluation for {cv_file.name}: {skip_reason}.")
+                    parsed_data = skipped_cv_result(cv_file.name, skip_reason)
+                    evaluated_results.append(parsed_data)
+                    show_ranking()
+                    if save_to_db:
+                        st.session_state.db.save_evaluation(job_title, candidate_name_from_filename(cv_file.name), parsed_data)
+                    continue
+                readable_cvs.append((cv_file, cv_text))
+                yield len(readable_cvs) - 1, cv_text
+
+        def render_result(i, foundational_data, evaluation):
+            cv_file, cv_text = readable_cvs[i]
+            parsed_data = structured_evaluation_result(evaluation, cv_file.name)
+
+            if not (parsed_data.get("Score") or parsed_data.get("Fit")):
+                fb_score, fb_fit, fb_rationale = compute_fallback_score(foundational_data, cv_text, weights, critical_skills_list)
+
+                parsed_data = {
+                    "filename": cv_file.name,
+                    "Score": format_score(fb_score),
+                    "Fit": fb_fit,
+                    "Rationale": fb_rationale,
+                    "Matched Skills": ", ".join(foundational_data.get("matched_skills_full", []) or []),
+                    "Missing Skills": ", ".join(foundational_data.get("missing_skills_full", []) or []),
+                    "Top Qualifications": ", ".join(foundational_data.get("top_qualifications_full", []) or []),
+                    "Quantifiable Achievements": "; ".join(foundational_data.get("quantifiable_achievements_full", []) or [])
+                }
+
+            score_header = parsed_data.get("Score") or "N/A"
+            fit_header = parsed_data.get("Fit") or "N/A"
+            score_class = format_score_color(score_header)
+
+            with st.expander(f"**{cv_file.name}** - Score: {score_header} | Fit: {fit_header}"):
+                st.markdown(f"<div class='metric-card'>", unsafe_allow_html=True)
+                st.markdown(f"<span class='{score_class}'>Score: {score_header}/10</span> | Fit: {fit_header}", unsafe_allow_html=True)
+                st.markdown("</div>", unsafe_allow_html=True)
+
+                col_a, col_b = st.columns(2)
+
+                with col_a:
+                    st.markdown("**Matched Skills**")
+                    st.success(parsed_data.get("Matched Skills") or "None identified")
+
+                    st.markdown("**Top Qualifications**")
+                    st.info(parsed_data.get("Top Qualifications") or "None identified")
+
+                with col_b:
+                    st.markdown("**Missing Skills**")
+                    st.error(parsed_data.get("Missing Skills") or "None identified")
+
+                    st.markdown("**Quantifiable Achievements**")
+                    st.success(parsed_data.get("Quantifiable Achievements") or "None identified")
+
+                st.markdown("**Rationale**")
+                st.write(parsed_data.get("Rationale", ""))
+
+                if evaluation.get("strengths") or evaluation.get("weaknesses"):
+                    st.markdown("### Strengths & Weaknesses Analysis")
+                    st.markdown(f"**Strengths:** {evaluation.get('strengths') or 'None identified'}")
+                    st.markdown(f"**Weaknesses:** {evaluation.get('weaknesses') or 'None identified'}")
+
+                with st.expander("View Raw Extracted Data"):
+                    st.json(foundational_data)
+
+            evaluated_results.append(parsed_data)
+            show_ranking()
+
+            if save_to_db:
+                st.session_state.db.save_evaluation(job_title, candidate_name_from_filename(cv_file.name), parsed_data)
+
+        try:
+            ai_service = st.session_state.ai_service
+            progress_bar.progress(0.1, text=f"Reading and extracting candidate data from {len(cv_files)} CVs...")
+            parse_futures = {parse_pool.submit(read_uploaded_file, cv_file): cv_file for cv_file in cv_files}
+            futures, phase1_keys = submit_assessments(ai_service, executor, jd_text, weights, readable_cv_items())
+
+            done = 0
+            for future in as_completed(futures):
+                indices, cached_data = futures[future]
+                try:
+                    result = future.result()
+                    if cached_data is None:
+                        outcomes = [(i, a["foundational"], a["evaluation"]) for i, a in zip(indices, result)]
+                    else:
+                        outcomes = [(indices[0], cached_data, result)]
+                except Exception as e:
+                    for i in indices:
+                        st.error(f"Error processing {readable_cvs[i][0].name}: {e}")
+                    outcomes = []
+                    done += len(indices)
+                for i, foundational_data, evaluation in outcomes:
+                    done += 1
+                    cv_file = readable_cvs[i][0]
+                    progress_bar.progress(0.1 + 0.9 * done / len(readable_cvs), text=f"Processed {cv_file.name} ({done}/{len(readable_cvs)})")
+                    try:
+                        if cached_data is None:
+                            remember_phase1(ai_service, phase1_keys[i], foundational_data)
+                        render_result(i, foundational_data, evaluation)
+                    except Exception as e:
+                        st.error(f"Error processing {cv_file.name}: {e}")
+                        st.text(traceback.format_exc())
+        finally:
+            parse_pool.shutdown(cancel_futures=True)
+            executor.shutdown(cancel_futures=True)
+
+        live_ranking.empty()
         progress_bar.progress(1.0, text="All files processed!")
 
         st.markdown("---")
         st.subheader("Final Evaluation Report")
 
         if evaluated_results:
-            df_results = pd.DataFrame(evaluated_results)
-            df_results["Score"] = pd.to_numeric(df_results.get("Score", None), errors='coerce')
-
-            if 'filename' in df_results.columns:
-                cols = ['filename'] + [c for c in df_results.columns if c != 'filename']
-                df_results = df_results[cols]
-
-            df_results = df_results.sort_values(by="Score", ascending=False, na_position='last')
+            df_results = pd.DataFrame.from_records(evaluated_results, columns=CSV_FIELDNAMES)
+            df_results["Score"] = pd.to_numeric(df_results["Score"], errors='coerce')
+            df_results.sort_values(by="Score", ascending=False, na_position='last', inplace=True, ignore_index=True)
 
-            high_count = len(df_results[df_results['Fit'] == 'High']) if 'Fit' in df_results.columns else 0
-            medium_count = len(df_results[df_results['Fit'] == 'Medium']) if 'Fit' in df_results.columns else 0
-            low_count = len(df_results[df_results['Fit'] == 'Low']) if 'Fit' in df_results.columns else 0
+            fit_counts = df_results['Fit'].value_counts()
+            high_count = int(fit_counts.get('High', 0))
+            medium_count = int(fit_counts.get('Medium', 0))
+            low_count = int(fit_counts.get('Low', 0))
 
             c1, c2, c3, c4 = st.columns(4)
             with c1:
@@ -250,7 +337,7 @@ def render_evaluation_page():
 
             st.dataframe(df_results, use_container_width=True, height=400)
 
-            csv_data = to_csv_string(evaluated_results)
+            csv_data = to_csv_bytes(df_results)
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
             st.download_button(
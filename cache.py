@@ -0,0 +1,54 @@
+import hashlib
+import os
+import tempfile
+import time
+import orjson
+from config import CACHE_DIR, CACHE_TTL_SECONDS
+
+class ResponseCache:
+    def __init__(self, cache_dir=CACHE_DIR, ttl=CACHE_TTL_SECONDS):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        try:
+            os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+            os.chmod(self.cache_dir, 0o700)
+        except OSError as e:
+            print(f"Cache directory error: {e}")
+
+    def make_key(self, model, prompt, schema=None):
+        raw = (model + prompt).encode("utf-8") + orjson.dumps(schema or {}, option=orjson.OPT_SORT_KEYS)
+        return hashlib.sha256(raw).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                entry = orjson.loads(f.read())
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - entry.get("created_at", 0) > self.ttl:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return entry.get("value")
+
+    def set(self, key, value):
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(orjson.dumps({"created_at": time.time(), "value": value}))
+            os.replace(tmp_path, self._path(key))
+        except (OSError, TypeError) as e:
+            print(f"Cache write error: {e}")
+            if tmp_path:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,6 +10,25 @@ SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
 
 MODEL_NAME = "gemini-2.5-flash"
 CV_EXTENSIONS = ('.txt', '.pdf')
+MIN_CV_CHARS = 200
+MAX_PROMPT_TEXT_CHARS = 12_000
+MIN_CV_DIGIT_RUNS = 3
+MAX_FILE_TEXT_CHARS = 40_000
 
 MAX_RETRIES = 4
 INITIAL_BACKOFF = 1
+MAX_BACKOFF = 30
+MAX_RETRIES_RATE = 5
+MAX_RETRIES_VALIDATION = 2
+REQUEST_TIMEOUT_MS = 60_000
+MAX_CONCURRENT_REQUESTS = 8
+PARSE_WORKERS = 4
+GEMINI_RPM = 14
+GEMINI_TPM = 250_000
+THROTTLE_STATUS_CODES = (429, 503)
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+BATCH_CHAR_BUDGET = 200_000
+MAX_BATCH_SIZE = 5
+
+CACHE_DIR = os.getenv("GEMINI_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "gemini_cache")
+CACHE_TTL_SECONDS = 7 * 86400
@@ -1,5 +1,20 @@
 import re
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+from config import MIN_CV_CHARS, MIN_CV_DIGIT_RUNS
+
+_DIGIT_RUN_RE = re.compile(r"\d+")
+_FIT_RE = re.compile(r'\b(high|medium|moderate|low)\b', re.IGNORECASE)
+_FIT_LEVELS = {'high': 'High', 'medium': 'Medium', 'moderate': 'Medium', 'low': 'Low'}
+_SENIORITY_RE = re.compile(r'senior|lead|manager|principal|head|director|vp|vice president|cto|ceo')
+
+def normalize_fit_from_text(text: str) -> str:
+    m = _FIT_RE.search(text or "")
+    if not m:
+        return ''
+    return _FIT_LEVELS[m.group(1).lower()]
+
+def format_score(score: float) -> str:
+    return str(int(score)) if float(score).is_integer() else str(round(score, 1))
 
 def compute_fallback_score(foundational_data: Dict, cv_text: str, weights: Dict, critical_skills_list: List[str]) -> Tuple[float, str, str]:
     matched = foundational_data.get("matched_skills_full", []) or []
@@ -19,8 +34,7 @@ def compute_fallback_score(foundational_data: Dict, cv_text: str, weights: Dict,
     ach_score = min(1.0, len(quant_ach) / 2.0)
     exp_presence = 1.0 if exp_summary.strip() else 0.0
 
-    seniority_keywords = ["senior", "lead", "manager", "principal", "head", "director", "vp", "vice president", "cto", "ceo"]
-    seniority_score = 1.0 if any(k in exp_summary for k in seniority_keywords) else 0.0
+    seniority_score = 1.0 if _SENIORITY_RE.search(exp_summary) else 0.0
 
     years_score = min(1.0, years_exp / 10.0)
 
@@ -63,11 +77,9 @@ def compute_fallback_score(foundational_data: Dict, cv_text: str, weights: Dict,
     score -= miss_penalty
 
     if critical_skills_list:
-        missing_criticals = []
         crit_lower = [c.strip().lower() for c in critical_skills_list if c.strip()]
-        for crit in crit_lower:
-            if not any(crit in (s.lower()) for s in matched):
-                missing_criticals.append(crit)
+        matched_lower = [s.lower() for s in matched if s]
+        missing_criticals = [c for c in crit_lower if not any(c in m for m in matched_lower)]
         if missing_criticals:
             score = min(score, 4.5)
 
@@ -100,57 +112,37 @@ def compute_fallback_score(foundational_data: Dict, cv_text: str, weights: Dict,
     return score, fit, rationale
 
 
-def parse_markdown_table(table_string: str, filename: str) -> Dict:
-    if not isinstance(table_string, str):
-        return {"filename": filename, "error": "No table string provided."}
-
-    txt = table_string.strip()
-    if not txt:
-        return {"filename": filename, "error": "Empty string."}
-
-    txt = re.sub(r'^\s*```[a-zA-Z0-9]*\s*', '', txt)
-    txt = re.sub(r'\s*```\s*$', '', txt)
-
-    lines = [ln.rstrip() for ln in txt.splitlines() if ln.strip()]
-
-    header_idx = None
-    for i, line in enumerate(lines):
-        if '|' in line and 'Score' in line:
-            header_idx = i
-            break
-
-    if header_idx is None or header_idx + 2 >= len(lines):
-        return {"filename": filename, "error": "No valid markdown table found."}
-
-    header_line = lines[header_idx]
-    data_line = lines[header_idx + 2] if (header_idx + 2) < len(lines) else ""
-
-    headers = [h.strip() for h in header_line.split('|') if h.strip()]
-    data_row = [d.strip() for d in data_line.split('|') if d.strip()]
+def structured_evaluation_result(evaluation: Dict, filename: str) -> Dict:
+    score = evaluation.get('score')
+    return {
+        'filename': filename,
+        'Score': '' if score is None else format_score(max(0.0, min(10.0, float(score)))),
+        'Fit': normalize_fit_from_text(evaluation.get('fit', '')),
+        'Rationale': evaluation.get('rationale', ''),
+        'Matched Skills': evaluation.get('matched_skills', ''),
+        'Missing Skills': evaluation.get('missing_skills', ''),
+        'Top Qualifications': evaluation.get('top_qualifications', ''),
+        'Quantifiable Achievements': evaluation.get('quantifiable_achievements', ''),
+    }
 
-    if len(headers) != len(data_row):
-        if len(data_row) < len(headers):
-            data_row += [""] * (len(headers) - len(data_row))
-        else:
-            data_row = data_row[:len(headers)]
 
-    result = dict(zip(headers, data_row))
-    result['filename'] = filename
+def should_skip_cv(cv_text: str) -> Optional[str]:
+    text = (cv_text or "").strip()
+    if len(text) < MIN_CV_CHARS:
+        return f"only {len(text)} characters of text"
+    if "@" not in text and len(_DIGIT_RUN_RE.findall(text)) < MIN_CV_DIGIT_RUNS:
+        return "no contact details or dates found"
+    return None
 
-    normalized = {}
-    for k, v in result.items():
-        norm_k = re.sub(r'[^A-Za-z0-9 ]', '', k).strip()
-        normalized[norm_k] = v
 
-    mapped = {
+def skipped_cv_result(filename: str, reason: str) -> Dict:
+    return {
         'filename': filename,
-        'Score': normalized.get('Score', normalized.get('score', '')),
-        'Fit': normalized.get('Fit', normalized.get('fit', '')),
-        'Rationale': normalized.get('Rationale', normalized.get('rationale', '')),
-        'Matched Skills': normalized.get('Matched Skills', normalized.get('MatchedSkills', '')),
-        'Missing Skills': normalized.get('Missing Skills', normalized.get('MissingSkills', '')),
-        'Top Qualifications': normalized.get('Top Qualifications', normalized.get('TopQualifications', '')),
-        'Quantifiable Achievements': normalized.get('Quantifiable Achievements', normalized.get('QuantifiableAchievements', '')),
+        'Score': '0',
+        'Fit': 'Low',
+        'Rationale': f"CV appears empty or malformed ({reason}); not sent for AI evaluation.",
+        'Matched Skills': '',
+        'Missing Skills': '',
+        'Top Qualifications': '',
+        'Quantifiable Achievements': '',
     }
-
-    return mapped
@@ -1,7 +1,11 @@
+import hashlib
+import io
 import os
+import fitz
 import streamlit as st
 from pypdf import PdfReader
 from pypdf.errors import PdfReadError
+from config import MAX_FILE_TEXT_CHARS
 
 def safe_file_type(uploaded_file):
     try:
@@ -18,39 +22,71 @@ def safe_file_type(uploaded_file):
     except Exception:
         return None
 
-@st.cache_data
+def _extract_page_text(page):
+    try:
+        return page.extract_text() or ""
+    except Exception:
+        return ""
+
+def join_capped(texts, max_chars=MAX_FILE_TEXT_CHARS):
+    parts = []
+    total = 0
+    for text in texts:
+        if not text:
+            continue
+        parts.append(text)
+        total += len(text)
+        if total >= max_chars:
+            break
+    return "\n".join(parts)[:max_chars].strip()
+
+def extract_pdf_text_pypdf(reader):
+    return join_capped(_extract_page_text(page) for page in reader.pages)
+
+def extract_pdf_text_pymupdf(file_bytes, filename):
+    doc = fitz.open(stream=file_bytes, filetype="pdf")
+    try:
+        if doc.needs_pass:
+            st.warning(f"PDF '{filename}' is encrypted. Skipping.")
+            return None
+        if doc.page_count == 0:
+            st.warning(f"PDF '{filename}' contains no readable pages.")
+            return None
+        return join_capped(page.get_text("text") for page in doc)
+    finally:
+        doc.close()
+
 def read_uploaded_file(uploaded_file):
     try:
-        ftype = safe_file_type(uploaded_file)
+        file_bytes = uploaded_file.getvalue()
+    except Exception as e:
+        st.error(f"Error reading file '{getattr(uploaded_file,'name', '')}': {e}")
+        return None
+    return extract_text(file_bytes, getattr(uploaded_file, "name", ""), safe_file_type(uploaded_file))
+
+@st.cache_data(persist="disk", show_spinner=False, hash_funcs={bytes: lambda b: hashlib.blake2b(b, digest_size=16).digest()})
+def extract_text(file_bytes, filename, ftype):
+    try:
         if ftype == "text/plain":
-            raw = uploaded_file.read()
-            if isinstance(raw, bytes):
-                return raw.decode("utf-8", errors="ignore")
-            return str(raw)
+            return file_bytes[:MAX_FILE_TEXT_CHARS * 4].decode("utf-8", errors="ignore")[:MAX_FILE_TEXT_CHARS]
         elif ftype == "application/pdf":
-            reader = PdfReader(uploaded_file)
+            try:
+                return extract_pdf_text_pymupdf(file_bytes, filename)
+            except Exception:
+                pass
+            reader = PdfReader(io.BytesIO(file_bytes))
             if reader.is_encrypted:
-                st.warning(f"PDF '{uploaded_file.name}' is encrypted. Skipping.")
+                st.warning(f"PDF '{filename}' is encrypted. Skipping.")
                 return None
             if not reader.pages:
-                st.warning(f"PDF '{uploaded_file.name}' contains no readable pages.")
+                st.warning(f"PDF '{filename}' contains no readable pages.")
                 return None
-            text = ""
-            for page in reader.pages:
-                try:
-                    pt = page.extract_text() or ""
-                except Exception:
-                    pt = ""
-                text += pt + "\n"
-            return text.strip()
+            return extract_pdf_text_pypdf(reader)
         else:
-            raw = uploaded_file.read()
-            if isinstance(raw, bytes):
-                return raw.decode("utf-8", errors="ignore")
-            return str(raw)
+            return file_bytes[:MAX_FILE_TEXT_CHARS * 4].decode("utf-8", errors="ignore")[:MAX_FILE_TEXT_CHARS]
     except PdfReadError as e:
-        st.error(f"PDF read error '{uploaded_file.name}': {e}")
+        st.error(f"PDF read error '{filename}': {e}")
         return None
     except Exception as e:
-        st.error(f"Error reading file '{getattr(uploaded_file,'name', '')}': {e}")
+        st.error(f"Error reading file '{filename}': {e}")
         return None
@@ -0,0 +1,30 @@
+from typing import List, Optional, Union
+from pydantic import BaseModel, Field, TypeAdapter
+
+class CandidateData(BaseModel):
+    matched_skills_full: List[str] = []
+    missing_skills_full: List[str] = []
+    top_qualifications_full: List[str] = []
+    quantifiable_achievements_full: List[str] = []
+    relevant_experience_summary: str = ""
+    years_of_experience: Union[int, float] = 0
+    education_level: str = "Unknown"
+
+class CandidateEvaluation(BaseModel):
+    score: Optional[float] = None
+    fit: str = ""
+    rationale: str = ""
+    matched_skills: str = ""
+    missing_skills: str = ""
+    top_qualifications: str = ""
+    quantifiable_achievements: str = ""
+    strengths: str = ""
+    weaknesses: str = ""
+
+class CandidateAssessment(BaseModel):
+    foundational: CandidateData = Field(default_factory=CandidateData)
+    evaluation: CandidateEvaluation = Field(default_factory=CandidateEvaluation)
+
+CANDIDATE_EVALUATION_ADAPTER = TypeAdapter(CandidateEvaluation)
+CANDIDATE_ASSESSMENT_ADAPTER = TypeAdapter(CandidateAssessment)
+CANDIDATE_ASSESSMENT_LIST_ADAPTER = TypeAdapter(List[CandidateAssessment])
@@ -0,0 +1,51 @@
+import threading
+import time
+from collections import deque
+
+class RateLimiter:
+    def __init__(self, max_calls, period, max_tokens=None, max_concurrency=None,
+                 increase_step=0.5, decrease_factor=0.5):
+        self.max_calls = max_calls
+        self.period = period
+        self.max_tokens = max_tokens
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(max_concurrency) if max_concurrency else None
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self._calls = deque()
+        self._window_tokens = 0
+        self._in_flight = 0
+        self._cond = threading.Condition()
+
+    def _prune(self, now):
+        while self._calls and now - self._calls[0][0] >= self.period:
+            _, tokens = self._calls.popleft()
+            self._window_tokens -= tokens
+
+    def acquire(self, tokens=0):
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._prune(now)
+                if self.concurrency is not None and self._in_flight >= max(1, int(self.concurrency)):
+                    self._cond.wait()
+                    continue
+                over_rpm = len(self._calls) >= self.max_calls
+                over_tpm = bool(self.max_tokens and self._calls and self._window_tokens + tokens > self.max_tokens)
+                if over_rpm or over_tpm:
+                    self._cond.wait(self.period - (now - self._calls[0][0]))
+                    continue
+                self._calls.append((now, tokens))
+                self._window_tokens += tokens
+                self._in_flight += 1
+                return
+
+    def release(self, throttled=False):
+        with self._cond:
+            self._in_flight -= 1
+            if self.concurrency is not None:
+                if throttled:
+                    self.concurrency = max(1.0, self.concurrency * self.decrease_factor)
+                else:
+                    self.concurrency = min(float(self.max_concurrency), self.concurrency + self.increase_step)
+            self._cond.notify_all()
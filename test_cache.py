@@ -0,0 +1,43 @@
+import os
+import stat
+import threading
+from cache import ResponseCache
+
+
+def test_cache_round_trip(tmp_path):
+    cache = ResponseCache(str(tmp_path / "c"), ttl=60)
+    key = cache.make_key("m", "prompt", {"type": "OBJECT"})
+    assert cache.get(key) is None
+    cache.set(key, {"score": 8})
+    assert cache.get(key) == {"score": 8}
+
+
+def test_cache_key_ignores_schema_key_order(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=60)
+    assert cache.make_key("m", "p", {"a": 1, "b": 2}) == cache.make_key("m", "p", {"b": 2, "a": 1})
+    assert cache.make_key("m", "p") != cache.make_key("n", "p")
+
+
+def test_cache_directory_is_private(tmp_path):
+    cache = ResponseCache(str(tmp_path / "c"), ttl=60)
+    cache.set("k", "v")
+    assert stat.S_IMODE(os.stat(cache.cache_dir).st_mode) == 0o700
+    assert stat.S_IMODE(os.stat(cache._path("k")).st_mode) == 0o600
+
+
+def test_expired_entries_are_removed(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=-1)
+    cache.set("k", "v")
+    assert cache.get("k") is None
+    assert not os.path.exists(cache._path("k"))
+
+
+def test_concurrent_writes_to_one_key_leave_a_valid_entry(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=60)
+    threads = [threading.Thread(target=cache.set, args=("k", {"n": n})) for n in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert cache.get("k") in [{"n": n} for n in range(16)]
+    assert not [name for name in os.listdir(cache.cache_dir) if name.endswith(".tmp")]
@@ -0,0 +1,65 @@
+import threading
+import time
+from rate_limiter import RateLimiter
+
+
+def _timed_acquire(limiter, tokens=0):
+    start = time.monotonic()
+    limiter.acquire(tokens)
+    limiter.release()
+    return time.monotonic() - start
+
+
+def test_request_window_blocks_until_oldest_call_expires():
+    limiter = RateLimiter(2, 0.2)
+    assert _timed_acquire(limiter) < 0.05
+    assert _timed_acquire(limiter) < 0.05
+    assert _timed_acquire(limiter) >= 0.15
+
+
+def test_token_window_blocks_when_budget_is_exhausted():
+    limiter = RateLimiter(100, 0.2, max_tokens=10)
+    assert _timed_acquire(limiter, 6) < 0.05
+    assert _timed_acquire(limiter, 6) >= 0.15
+
+
+def test_oversize_request_is_admitted_into_an_empty_window():
+    limiter = RateLimiter(100, 0.2, max_tokens=10)
+    assert _timed_acquire(limiter, 50) < 0.05
+    assert _timed_acquire(limiter, 1) >= 0.15
+
+
+def test_throttling_halves_concurrency_down_to_one():
+    limiter = RateLimiter(100, 60, max_concurrency=4)
+    for expected in (2.0, 1.0, 1.0):
+        limiter.acquire()
+        limiter.release(throttled=True)
+        assert limiter.concurrency == expected
+
+
+def test_successful_calls_recover_concurrency_up_to_the_maximum():
+    limiter = RateLimiter(100, 60, max_concurrency=2)
+    limiter.acquire()
+    limiter.release(throttled=True)
+    for expected in (1.5, 2.0, 2.0):
+        limiter.acquire()
+        limiter.release()
+        assert limiter.concurrency == expected
+
+
+def test_concurrency_limit_blocks_until_release():
+    limiter = RateLimiter(100, 60, max_concurrency=1)
+    limiter.acquire()
+    acquired = threading.Event()
+
+    def worker():
+        limiter.acquire()
+        acquired.set()
+        limiter.release()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    assert not acquired.wait(0.1)
+    limiter.release()
+    assert acquired.wait(1)
+    thread.join()
@@ -0,0 +1,52 @@
+import pandas as pd
+from utils import CSV_FIELDNAMES, compact_text, to_csv_bytes
+
+
+def test_compact_text_resumes_after_boilerplate_without_blank_lines():
+    cv = "John Doe\nInterests\nChess\nExperience\nSenior Engineer at X 2018-2024\nSkills\nPython, Kubernetes"
+    assert compact_text(cv) == "John Doe\nExperience\nSenior Engineer at X 2018-2024\nSkills\nPython, Kubernetes"
+
+
+def test_compact_text_bounds_skipped_boilerplate_lines():
+    cv = "References\n" + "\n".join(f"Referee {i}" for i in range(20))
+    kept = compact_text(cv).splitlines()
+    assert kept[0] == "Referee 8"
+    assert len(kept) == 12
+
+
+def test_compact_text_skips_boilerplate_until_blank_line():
+    cv = "Hobbies\nChess\nHiking\n\nEducation\nBSc Computer Science"
+    assert compact_text(cv) == "Education\nBSc Computer Science"
+
+
+def test_compact_text_drops_contact_lines():
+    assert compact_text("Jane Roe\nPhone: 555 0100\nLinkedIn: jane") == "Jane Roe"
+
+
+def test_compact_text_keeps_lines_that_only_start_with_a_boilerplate_word():
+    cv = ("Jane\nInterests include building distributed systems\nWorked at Google 2015-2020 as SRE\n"
+          "Led migration of 200 services\nVolunteer Work\nFood bank")
+    assert compact_text(cv) == cv
+    cv = "Senior Engineer\nReferences to RFCs in my work: 7231\nBuilt HTTP proxy"
+    assert compact_text(cv) == cv
+
+
+def test_compact_text_keeps_lines_that_only_start_with_a_contact_word():
+    cv = "Jane Roe\nMobile - iOS and Android apps shipped\nAddress - responsive layouts"
+    assert compact_text(cv) == cv
+
+
+def test_compact_text_stops_skipping_at_unlisted_headings():
+    cv = "Hobbies\nChess, hiking\nCommunity Outreach\nTaught coding to 40 students"
+    assert compact_text(cv) == "Community Outreach\nTaught coding to 40 students"
+
+
+def test_to_csv_bytes_keeps_integer_scores_when_some_are_missing():
+    df = pd.DataFrame.from_records(
+        [{"filename": "a.pdf", "Score": 8.0}, {"filename": "b.pdf", "Score": 7.5}, {"filename": "c.pdf", "Score": None}],
+        columns=CSV_FIELDNAMES,
+    )
+    rows = to_csv_bytes(df).decode("utf-8").splitlines()
+    assert rows[1].startswith("a.pdf,8,")
+    assert rows[2].startswith("b.pdf,7.5,")
+    assert rows[3].startswith("c.pdf,,")
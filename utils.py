@@ -1,16 +1,24 @@
-import csv
-import io
-from typing import List, Dict
+import re
+import pandas as pd
+from config import MAX_PROMPT_TEXT_CHARS
+from evaluator import format_score
 
-def to_csv_string(results: List[Dict]) -> str:
-    if not results:
-        return ""
-    fieldnames = ['filename', 'Score', 'Fit', 'Rationale', 'Matched Skills', 'Missing Skills', 'Top Qualifications', 'Quantifiable Achievements']
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=fieldnames)
-    writer.writeheader()
-    writer.writerows(results)
-    return output.getvalue()
+_BOILERPLATE_SECTION_RE = re.compile(r"(?i)^(references|hobbies|interests|hobbies (and|&) interests|personal details)\s*:?$")
+_CONTACT_LINE_RE = re.compile(r"(?i)^((phone|mobile|tel)\s*[:\-]\s*\+?[\d\s().\-]{7,}|linkedin\s*[:\-]\s*\S+|address\s*[:\-].*\d.*)$")
+_SECTION_HEADING_RE = re.compile(r"(?i)^(summary|profile|objective|(work |professional )?experience|employment( history)?|work history|internships?|volunteer(ing| work| experience)?|leadership|(technical |key )?skills|education|projects|certifications?|qualifications|achievements|awards|publications|languages)\s*:?$")
+_MAX_BOILERPLATE_LINES = 8
+_INLINE_WHITESPACE_RE = re.compile(r"[ \t\f\v]+")
+_TRUNCATION_MARKER = "\n[...]\n"
+
+CSV_FIELDNAMES = ['filename', 'Score', 'Fit', 'Rationale', 'Matched Skills', 'Missing Skills', 'Top Qualifications', 'Quantifiable Achievements']
+
+def to_csv_bytes(df: pd.DataFrame) -> bytes:
+    if df is None or df.empty:
+        return b""
+    export = df.reindex(columns=CSV_FIELDNAMES)
+    scores = pd.to_numeric(export["Score"], errors="coerce")
+    export["Score"] = [format_score(s) if pd.notna(s) else "" for s in scores]
+    return export.to_csv(index=False).encode("utf-8")
 
 def format_score_color(score):
     try:
@@ -30,3 +38,37 @@ def truncate_text(text, max_length=100):
     if len(text) <= max_length:
         return text
     return text[:max_length] + "..."
+
+def _is_section_heading(line):
+    if _SECTION_HEADING_RE.match(line) or line.endswith(":") or (line.isupper() and len(line) <= 40):
+        return True
+    words = line.split()
+    return 2 <= len(words) <= 4 and all(w[:1].isupper() for w in words) and not any(c.isdigit() or c in ",.@|" for c in line)
+
+def compact_text(text, max_chars=MAX_PROMPT_TEXT_CHARS):
+    lines = []
+    skip_budget = 0
+    for line in (text or "").splitlines():
+        line = _INLINE_WHITESPACE_RE.sub(" ", line).strip()
+        if not line:
+            skip_budget = 0
+            if lines and lines[-1]:
+                lines.append("")
+            continue
+        if skip_budget:
+            if not _is_section_heading(line):
+                skip_budget -= 1
+                continue
+            skip_budget = 0
+        if _BOILERPLATE_SECTION_RE.match(line):
+            skip_budget = _MAX_BOILERPLATE_LINES
+            continue
+        if _CONTACT_LINE_RE.match(line):
+            continue
+        lines.append(line)
+    text = "\n".join(lines).strip()
+    if len(text) <= max_chars:
+        return text
+    head = max_chars * 3 // 4
+    tail = max_chars - head - len(_TRUNCATION_MARKER)
+    return text[:head] + _TRUNCATION_MARKER + text[len(text) - max(tail, 0):]